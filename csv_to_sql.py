@@ -13,6 +13,7 @@ import csv
 import traceback
 import logging
 import re
+from functools import lru_cache
 import xlrd
 import pymysql
 
@@ -172,6 +173,166 @@ def clear_str(str, rule_name):
     return clear_rule()
 
 
+# GB 11643-1999 公民身份号码校验
+ID_CARD_WEIGHTS = (7, 9, 10, 5, 8, 4, 2, 1, 6, 3, 7, 9, 10, 5, 8, 4, 2)
+ID_CARD_CHECK_CODES = '10X98765432'
+ID_CARD_REGIONS = {
+    '11', '12', '13', '14', '15', '21', '22', '23', '31', '32', '33', '34', '35', '36', '37',
+    '41', '42', '43', '44', '45', '46', '50', '51', '52', '53', '54', '61', '62', '63', '64', '65',
+    '71', '81', '82', '83', '91',
+}
+ID_CARD_18_PATTERN = re.compile(r'^\d{17}[\dX]$')
+ID_CARD_15_PATTERN = re.compile(r'^\d{15}$')
+PHONE_DIGIT_PATTERN = re.compile(r'^\d+$')
+PHONE_PREFIX_PATTERN = re.compile(r'^1[3-9]')
+
+# 拒绝原因
+ID_LENGTH = 'ID_LENGTH'
+ID_FORMAT = 'ID_FORMAT'
+ID_REGION = 'ID_REGION'
+ID_BIRTH_DATE = 'ID_BIRTH_DATE'
+ID_CHECKSUM = 'ID_CHECKSUM'
+PHONE_FORMAT = 'PHONE_FORMAT'
+PHONE_LENGTH = 'PHONE_LENGTH'
+PHONE_PREFIX = 'PHONE_PREFIX'
+
+
+@lru_cache(maxsize=None)
+def _is_valid_birth_date(date_str):
+    try:
+        birth_date = datetime.datetime.strptime(date_str, '%Y%m%d').date()
+    except ValueError:
+        return False
+    return datetime.date(1900, 1, 1) <= birth_date <= datetime.date.today()
+
+
+def check_id_numbers(values: list):
+    """
+    批量校验身份证号：长度、格式、地区码、出生日期、18位校验码，15位旧号码只校验出生日期
+    :return: 与 values 等长的列表，合法或为空时为 None，否则为拒绝原因
+    """
+    reasons = []
+    for value in values:
+        # 校验将要写入的原值，小写 x 不会被规则转换，视为不合法
+        value = value or ''
+        if not value:
+            reasons.append(None)
+        elif len(value) not in (15, 18):
+            reasons.append(ID_LENGTH)
+        elif not (ID_CARD_18_PATTERN.match(value) or ID_CARD_15_PATTERN.match(value)):
+            reasons.append(ID_FORMAT)
+        elif value[:2] not in ID_CARD_REGIONS:
+            reasons.append(ID_REGION)
+        elif not _is_valid_birth_date(value[6:14] if len(value) == 18 else '19' + value[6:12]):
+            reasons.append(ID_BIRTH_DATE)
+        elif len(value) == 18 and ID_CARD_CHECK_CODES[
+                sum([int(c) * w for c, w in zip(value, ID_CARD_WEIGHTS)]) % 11] != value[17]:
+            reasons.append(ID_CHECKSUM)
+        else:
+            reasons.append(None)
+    return reasons
+
+
+def check_phones(values: list):
+    """
+    批量校验手机号：11位数字且以 13-19 开头
+    :return: 与 values 等长的列表，合法或为空时为 None，否则为拒绝原因
+    """
+    reasons = []
+    for value in values:
+        if not value:
+            reasons.append(None)
+        elif not PHONE_DIGIT_PATTERN.match(value):
+            reasons.append(PHONE_FORMAT)
+        elif len(value) != 11:
+            reasons.append(PHONE_LENGTH)
+        elif not PHONE_PREFIX_PATTERN.match(value):
+            reasons.append(PHONE_PREFIX)
+        else:
+            reasons.append(None)
+    return reasons
+
+
+VALIDATION_COLUMNS = {
+    '投保人证件号': check_id_numbers,
+    '被报人证件号': check_id_numbers,
+    '学生证件号': check_id_numbers,
+    '手机号': check_phones,
+    '投保人手机号': check_phones,
+    '被保人手机号': check_phones,
+}
+
+
+def batch_generator(rows, batch_size=10000):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def validate_batch(rows: list, rule_name):
+    """
+    按列批量校验一批数据，校验的是按 rule_name 清洗后将要写入的值
+    :return: 与 rows 等长的列表，每项为该行不合法的 {列名: 原因}
+    """
+    invalid = [{} for _ in rows]
+    for column, check in VALIDATION_COLUMNS.items():
+        if column not in rows[0]:
+            continue
+        values = [clear_str(row.get(column), rule_name) for row in rows]
+        for index, reason in enumerate(check(values)):
+            if reason:
+                invalid[index][column] = reason
+    return invalid
+
+
+def validate_rows(rows, rule_name, reject_file, batch_size=10000):
+    """
+    校验阶段：有证件号/手机号不合法的行写入 reject_file（附 reject_reason 列）
+    :return: 生成 (row, 不合法的 {列名: 原因})，调用方只跳过不合法字段的更新
+    """
+    total = 0
+    reject_count = 0
+    f = None
+    writer = None
+    # 拒绝文件在出现第一条拒绝行时才创建，先删除上次运行留下的文件
+    if os.path.exists(reject_file):
+        os.remove(reject_file)
+    try:
+        for batch in batch_generator(rows, batch_size):
+            invalid = validate_batch(batch, rule_name)
+            total += len(batch)
+            for row, row_invalid in zip(batch, invalid):
+                if row_invalid:
+                    reject_count += 1
+                    if writer is None:
+                        f = open(reject_file, 'w', encoding='utf-8', newline='')
+                        writer = csv.DictWriter(f, fieldnames=list(row.keys()) + ['reject_reason'])
+                        writer.writeheader()
+                    reasons = [f'{column}:{reason}' for column, reason in row_invalid.items()]
+                    writer.writerow(dict(row, reject_reason='|'.join(reasons)))
+                yield row, row_invalid
+    finally:
+        if f is not None:
+            f.close()
+
+    logger.info(f"Validate rows: {total}, rejected: {reject_count}, "
+                f"reject file: {reject_file if reject_count else '-'}")
+
+
+def valid_set_dict(row, rule_name, fields: dict, invalid: dict):
+    """
+    按 {数据库字段: csv列名} 生成清洗后的更新字段，去掉校验不通过的字段
+    :return: 没有可更新的字段时返回 None
+    """
+    set_dict = {field: clear_str(row[column], rule_name) for field, column in fields.items() if column not in invalid}
+    return set_dict or None
+
+
 def order_business_sql(order_business_files: list):
     for index, f in enumerate(order_business_files):
         rows = csv_generator_data(f)
@@ -228,60 +389,69 @@ def order_business_sql(order_business_files: list):
                                   {'pro_insure_phone': pro_insure_phone_9, 'update_time': update_time})
 
 
-def order_business_sql_v2(file_name, rule_name, update_time):
-    rows = csv_generator_data(file_name)
+def order_business_sql_v2(file_name, rule_name, update_time, reject_file=None):
+    rows = validate_rows(csv_generator_data(file_name), rule_name, reject_file or f'{file_name}.reject.csv')
 
-    for row in rows:
+    for row, invalid in rows:
         if row.get('投保人姓名') or row.get('被报人姓名'):
             csv_to_update_sql('order_business', f"business_id={row['business_id']}",
                                   {'pro_insure_name': clear_str(row['投保人姓名'], rule_name), 'pro_the_insure_name': clear_str(row['被报人姓名'], rule_name),
                                    'update_time': update_time})
 
         if row.get('投保人证件号') or row.get('被报人证件号'):
-            csv_to_update_sql('order_business', f"business_id={row['business_id']}",
-                                  {'pro_insure_id': clear_str(row['投保人证件号'], rule_name), 'pro_the_insure_id': clear_str(row['被报人证件号'], rule_name), 'update_time': update_time})
+            set_dict = valid_set_dict(row, rule_name, {'pro_insure_id': '投保人证件号', 'pro_the_insure_id': '被报人证件号'}, invalid)
+            if set_dict:
+                csv_to_update_sql('order_business', f"business_id={row['business_id']}",
+                                  dict(set_dict, update_time=update_time))
 
         if row.get('手机号'):
-            csv_to_update_sql('order_business', f"business_id={row['business_id']}",
-                                  {'pro_insure_phone': clear_str(row['手机号'], rule_name), 'update_time': update_time})
+            set_dict = valid_set_dict(row, rule_name, {'pro_insure_phone': '手机号'}, invalid)
+            if set_dict:
+                csv_to_update_sql('order_business', f"business_id={row['business_id']}",
+                                  dict(set_dict, update_time=update_time))
 
 
-def order_business_details_sql_v2(file_name, rule_name, update_time):
-    rows = csv_generator_data(file_name)
+def order_business_details_sql_v2(file_name, rule_name, update_time, reject_file=None):
+    rows = validate_rows(csv_generator_data(file_name), rule_name, reject_file or f'{file_name}.reject.csv')
 
-    for row in rows:
+    for row, invalid in rows:
         if row.get('投保人姓名') or row.get('被报人姓名'):
             csv_to_update_sql('order_business_details', f"id={row['id']}",
                                   {'pro_insure_name': clear_str(row['投保人姓名'], rule_name), 'pro_the_insure_name': clear_str(row['被报人姓名'], rule_name),
                                    'update_time': update_time})
 
         if row.get('投保人证件号') or row.get('被报人证件号'):
-            csv_to_update_sql('order_business_details', f"id={row['id']}",
-                                  {'pro_insure_cert_no': clear_str(row['投保人证件号'], rule_name), 'pro_the_insure_cert_no': clear_str(row['被报人证件号'], rule_name), 'update_time': update_time})
+            set_dict = valid_set_dict(row, rule_name, {'pro_insure_cert_no': '投保人证件号',
+                                                       'pro_the_insure_cert_no': '被报人证件号'}, invalid)
+            if set_dict:
+                csv_to_update_sql('order_business_details', f"id={row['id']}", dict(set_dict, update_time=update_time))
 
         if row.get('手机号'):
-            csv_to_update_sql('order_business_details', f"id={row['id']}",
-                                  {'pro_insure_phone': clear_str(row['手机号'], rule_name), 'update_time': update_time})
+            set_dict = valid_set_dict(row, rule_name, {'pro_insure_phone': '手机号'}, invalid)
+            if set_dict:
+                csv_to_update_sql('order_business_details', f"id={row['id']}", dict(set_dict, update_time=update_time))
 
 
-def order_member_the_insure_v2(file_name, rule_name, update_time):
-    rows = csv_generator_data(file_name)
+def order_member_the_insure_v2(file_name, rule_name, update_time, reject_file=None):
+    rows = validate_rows(csv_generator_data(file_name), rule_name, reject_file or f'{file_name}.reject.csv')
 
-    for row in rows:
+    for row, invalid in rows:
         if row.get('学生姓名') or row.get('被报人姓名'):
             csv_to_update_sql('order_member_the_insure', f"id={row['id']}",
                               {'student_name': clear_str(row['学生姓名'], rule_name),
                                'pro_the_insure_name': clear_str(row['被报人姓名'], rule_name), 'car_id_code': update_time})
 
         if row.get('学生证件号') or row.get('被报人证件号'):
-            csv_to_update_sql('order_member_the_insure', f"id={row['id']}",
-                              {'student_cert_no': clear_str(row['学生证件号'], rule_name),
-                               'pro_the_insure_cert_no': clear_str(row['被报人证件号'], rule_name), 'car_id_code': update_time})
+            set_dict = valid_set_dict(row, rule_name, {'student_cert_no': '学生证件号',
+                                                       'pro_the_insure_cert_no': '被报人证件号'}, invalid)
+            if set_dict:
+                csv_to_update_sql('order_member_the_insure', f"id={row['id']}", dict(set_dict, car_id_code=update_time))
 
         if row.get('投保人手机号') or row.get('被保人手机号'):
-            csv_to_update_sql('order_member_the_insure', f"id={row['id']}",
-                              {'pro_insure_phone': clear_str(row['投保人手机号'], rule_name),
-                               'pro_the_insure_phone': clear_str(row['被保人手机号'], rule_name), 'car_id_code': update_time})
+            set_dict = valid_set_dict(row, rule_name, {'pro_insure_phone': '投保人手机号',
+                                                       'pro_the_insure_phone': '被保人手机号'}, invalid)
+            if set_dict:
+                csv_to_update_sql('order_member_the_insure', f"id={row['id']}", dict(set_dict, car_id_code=update_time))
 
 
 def order_business_details_sql(order_business_details_files: list, rule):
@@ -451,5 +621,5 @@ if __name__ == "__main__":
     #    order_member_the_insure_sql(order_member_the_insure_files)
     # order_business_sql_v2(sys.argv[1], sys.argv[2], sys.argv[3])
     # order_business_details_sql_v2(sys.argv[1], sys.argv[2], sys.argv[3])
-    order_member_the_insure_v2(sys.argv[1], sys.argv[2], sys.argv[3])
+    order_member_the_insure_v2(sys.argv[1], sys.argv[2], sys.argv[3], sys.argv[4] if len(sys.argv) > 4 else None)
 
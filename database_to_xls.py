@@ -7,12 +7,17 @@
 import argparse
 import time
 import sys
+import os
+import json
+import hashlib
 import logging
 
 import xlwt
 import openpyxl
 import pymysql
 
+from mysql_pool import get_pool, close_all_pools
+
 
 def get_logger(name):
     logger = logging.getLogger(name)
@@ -40,43 +45,142 @@ def parse_options():
     parser.add_argument('-d', '--db', type=str, dest="db", required=True, default='', help="mysql db")
     parser.add_argument('-q', '--query', type=str, dest='query', required=False, help="mysql query")
     parser.add_argument('-o', '--output', type=str, dest='output', required=True, help="Output xls file name ")
+    parser.add_argument('--connect-timeout', type=int, dest='connect_timeout', required=False, default=10,
+                        help="default mysql connect timeout 10s")
+    parser.add_argument('-w', '--watermark-column', type=str, dest='watermark_column', required=False,
+                        help="incremental export: only rows with a newer value in this column, e.g. update_time or id, "
+                             "each increment is written to <output>_<timestamp>")
+    parser.add_argument('--state-file', type=str, dest='state_file', required=False,
+                        help="file keeping the last exported watermark, default: <output>.state.json")
+    parser.add_argument('--full', action='store_true', dest='full', default=False,
+                        help="ignore the saved watermark, export everything and overwrite the output")
     args = parser.parse_args()
+    if (args.full or args.state_file) and not args.watermark_column:
+        parser.error('--full and --state-file require --watermark-column')
 
     return args
 
 
 def writeExcel(data, path):
-    outwb = openpyxl.Workbook()  # 打开一个将写的文件
+    """
+    写入excel文件
+    :return: 写入的行数
+    """
+    outwb = openpyxl.Workbook(write_only=True)  # 打开一个将写的文件，流式写入
     outws = outwb.create_sheet(index=0)  # 在将写的文件创建sheet
+    has_title = False
+
+    count = 0
+    for row in data:
+        if not has_title:
+            outws.append(list(row.keys()))
+            has_title = True
+        outws.append(list(row.values()))
+        count += 1
+
+    outwb.save(path)  # 一定要记得保存
+    return count
+
+
+def load_watermark_state(path):
+    """
+    读取上次导出的水位，文件不存在时返回空状态
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_watermark_state(path, state):
+    """
+    先写临时文件再替换，避免中断时留下损坏的状态文件
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def incremental_query(query, watermark_column, since=True):
+    """
+    在原查询外包一层，按水位列过滤并排序；边界值使用 >= 以免漏掉同值的行
+    :param since: 是否带水位条件，首次导出时只排序
+    """
+    query = query.strip().rstrip(';')
+    if not since:
+        return f"SELECT * FROM ({query}) AS incremental_t ORDER BY {watermark_column}"
+    return (f"SELECT * FROM ({query.replace('%', '%%')}) AS incremental_t WHERE {watermark_column} >= %s "
+            f"ORDER BY {watermark_column}")
 
-    for row_idx, row in enumerate(data):
-        print(row)
 
-    #     for col_idx, val in enumerate(row):
-    #         outws.cell(row_idx +1, col_idx+1, val)
-    #
-    # outwb.save(path)  # 一定要记得保存
+def _watermark_value(value):
+    return value if isinstance(value, (int, float)) else str(value)
 
 
-def get_msyql_query_result(host, port, user, password, db, query):
+def _row_digest(row):
+    return hashlib.sha1('\x1f'.join([str(v) for v in row.values()]).encode('utf-8')).hexdigest()
+
+
+def increment_output_path(path):
+    """
+    增量导出写入单独的文件，避免每次读写全部历史数据
+    """
+    stem, ext = os.path.splitext(path)
+    return f"{stem}_{time.strftime('%Y%m%d%H%M%S')}{ext}"
+
+
+def incremental_rows(data, watermark_column, state):
+    """
+    过滤掉上次已导出的边界行，并在 state 中记录新的水位
+    state 中 boundary_digests 保存水位值上已导出行的摘要，下次遇到同一水位值时据此去重
+    水位列为 NULL 的行只在全量导出时输出，不参与水位计算
+    """
+    last_value = state.get('last_value')
+    exported = set(state.get('boundary_digests', []))
+    new_value, boundary = last_value, set(exported)
+
+    try:
+        for row in data:
+            if row[watermark_column] is None:
+                yield row
+                continue
+
+            value = _watermark_value(row[watermark_column])
+            digest = _row_digest(row)
+            if value == last_value and digest in exported:
+                continue
+
+            # 先记入边界再输出，调用方拿到的行都已计入 state
+            if value != new_value:
+                new_value, boundary = value, set()
+            boundary.add(digest)
+            yield row
+    finally:
+        # 只在结束时写回一次；中途失败时 state 也对应已输出的前缀
+        if new_value is not None:
+            state['last_value'] = new_value
+            state['boundary_digests'] = sorted(boundary)
+
+
+def get_msyql_query_result(host, port, user, password, db, query, params=None, **pool_options):
     """
     获取mysql查询结果
+    :param params: 查询参数
+    :param pool_options: 连接池参数，如 connect_timeout
     :return:
     """
+    pool = get_pool(host, port, user, password, db, **pool_options)
     try:
-        conn = pymysql.connect(
-            host=host,
-            port=int(port),
-            user=user,
-            password=password,
-            database=db,
-            autocommit=True
-        )
-        logger.info("Successfully connected to MySQL database")
+        conn = pool.acquire()
+    except Exception as e:
+        logger.error(f"Error connecting to MySQL database: {e}")
+        return
 
+    try:
         with conn.cursor(pymysql.cursors.SSDictCursor) as cursor:
             # 执行 SQL 查询
-            cursor.execute(query)
+            cursor.execute(query, params)
 
             result = cursor.fetchone()
             while result is not None:
@@ -86,8 +190,7 @@ def get_msyql_query_result(host, port, user, password, db, query):
     except Exception as e:
         logger.error(f"Error connecting to MySQL database: {e}")
     finally:
-        cursor.close()
-        conn.close()
+        pool.release(conn)
 
 
 
@@ -99,6 +202,33 @@ if __name__ == "__main__":
         query = args.query
     else:
         query = sys.stdin.read().strip()
-    writeExcel(get_msyql_query_result(args.host,args.port, args.user,args.password, args.db, query), args.output)
+    pool_options = dict(connect_timeout=args.connect_timeout)
+
+    if args.watermark_column:
+        state_file = args.state_file or f"{args.output}.state.json"
+        state = {} if args.full else load_watermark_state(state_file)
+        if state.get('watermark_column', args.watermark_column) != args.watermark_column:
+            logger.error(f"State file {state_file} belongs to column {state['watermark_column']}, use --full to reset")
+            sys.exit(1)
+
+        incremental = 'last_value' in state
+        if incremental:
+            logger.info(f"Incremental export from {args.watermark_column} >= {state['last_value']}")
+        params = (state['last_value'],) if incremental else None
+        rows = get_msyql_query_result(args.host, args.port, args.user, args.password, args.db,
+                                      incremental_query(query, args.watermark_column, incremental), params,
+                                      **pool_options)
+
+        state['watermark_column'] = args.watermark_column
+        output = increment_output_path(args.output) if incremental else args.output
+        count = writeExcel(incremental_rows(rows, args.watermark_column, state), output)
+        if incremental and count == 0:
+            os.remove(output)
+        save_watermark_state(state_file, state)
+        logger.info(f"Exported rows: {count} to {output if count else '-'}, watermark: {state.get('last_value')}")
+    else:
+        writeExcel(get_msyql_query_result(args.host,args.port, args.user,args.password, args.db, query,
+                                          **pool_options), args.output)
+    close_all_pools()
     end_time = time.time()
     logger.info(f"Export finish, cost time: {round(end_time - start_time, 2)}s")
@@ -11,9 +11,13 @@ import time
 import csv
 import traceback
 import logging
+import re
+from functools import partial
 
 import xlrd
-import pymysql
+
+from mysql_pool import get_pool, close_all_pools
+from schema_inference import infer_table_schema, build_create_table_sql, normalize_rows
 
 
 def get_logger(name):
@@ -28,6 +32,9 @@ def get_logger(name):
 
 logger = get_logger('import_data')
 
+SHADOW_TABLE_SUFFIX = '__shadow'
+OLD_TABLE_SUFFIX = '__old'
+
 
 def parse_options():
     parser = argparse.ArgumentParser(description='This is a tool for import excel/csv to mysql')
@@ -44,7 +51,23 @@ def parse_options():
     parser.add_argument('-f', '--file', type=str, dest='file', required=True, help="path to excel/csv file")
     parser.add_argument('-e', '--encoding', type=str, dest='encoding', required=False, default='utf-8',
                         help="default file encoding utf-8")
+    parser.add_argument('--connect-timeout', type=int, dest='connect_timeout', required=False, default=10,
+                        help="default mysql connect timeout 10s")
+    parser.add_argument('--bulk-session', action='store_true', dest='bulk_session', default=False,
+                        help="disable unique/foreign key checks and enlarge buffers for this session while importing")
+    parser.add_argument('--skip-binlog', action='store_true', dest='skip_binlog', default=False,
+                        help="with --bulk-session, also disable binlog; imported data will NOT reach replicas")
+    parser.add_argument('--replace-table', action='store_true', dest='replace_table', default=False,
+                        help="full refresh: load into a shadow table and swap it in with RENAME TABLE")
+    parser.add_argument('--create-table', action='store_true', dest='create_table', default=False,
+                        help="infer column types from the file and create the table if it does not exist")
+    parser.add_argument('--ddl-only', action='store_true', dest='ddl_only', default=False,
+                        help="print the inferred CREATE TABLE sql and exit without importing")
+    parser.add_argument('--sample-rows', type=int, dest='sample_rows', required=False, default=10000,
+                        help="rows sampled for type inference, 0 scans the whole file, default 10000")
     args = parser.parse_args()
+    if args.skip_binlog and not args.bulk_session:
+        parser.error('--skip-binlog requires --bulk-session')
 
     return args
 
@@ -121,32 +144,6 @@ def xls_generator_data(path: str):
         yield row_dict
 
 
-def connect_to_mysql(host: str, port: int, user: str, password: str, db: str):
-    """
-    连接mysql数据库
-    :param host:
-    :param port:
-    :param user:
-    :param password:
-    :param db:
-    :return:
-    """
-    try:
-        conn = pymysql.connect(
-            host=host,
-            port=int(port),
-            user=user,
-            password=password,
-            database=db,
-            autocommit=True
-        )
-        logger.info("Successfully connected to MySQL database")
-        return conn
-    except Exception as e:
-        logger.error(f"Error connecting to MySQL database: {e}")
-        return None
-
-
 def batch_insert_data(cursor, table: str, data_list: list):
     """
     批量插入数据
@@ -161,35 +158,142 @@ def batch_insert_data(cursor, table: str, data_list: list):
     logger.info(f"Import data length:{len(data_list)}, cost: {round(end_time - start_time, 2)}s")
 
 
+def check_replaceable(cursor, table: str):
+    """
+    CREATE TABLE ... LIKE 不会复制外键，RENAME 后引用该表的外键和触发器会跟随到 {table}__old，
+    目标表或 {table}__old 涉及外键/触发器时不能全量替换
+    """
+    old_table = f"{table}{OLD_TABLE_SUFFIX}"
+    cursor.execute("SELECT TABLE_NAME, CONSTRAINT_NAME, REFERENCED_TABLE_NAME "
+                   "FROM information_schema.REFERENTIAL_CONSTRAINTS "
+                   "WHERE CONSTRAINT_SCHEMA = DATABASE() AND "
+                   "(TABLE_NAME IN (%s, %s) OR REFERENCED_TABLE_NAME IN (%s, %s))",
+                   (table, old_table, table, old_table))
+    foreign_keys = [f"{row[0]}.{row[1]} -> {row[2]}" for row in cursor.fetchall()]
+    if foreign_keys:
+        raise RuntimeError(f"--replace-table is not supported for tables with foreign keys: {', '.join(foreign_keys)}")
+
+    cursor.execute("SELECT TRIGGER_NAME FROM information_schema.TRIGGERS "
+                   "WHERE EVENT_OBJECT_SCHEMA = DATABASE() AND EVENT_OBJECT_TABLE IN (%s, %s)",
+                   (table, old_table))
+    triggers = [row[0] for row in cursor.fetchall()]
+    if triggers:
+        raise RuntimeError(f"--replace-table is not supported for tables with triggers: {', '.join(triggers)}")
+
+
+def create_shadow_table(cursor, table: str):
+    """
+    创建与目标表结构相同的影子表，并去掉二级索引，导入完成后再统一重建
+    :return: (影子表名, 二级索引定义列表)
+    """
+    check_replaceable(cursor, table)
+    shadow_table = f"{table}{SHADOW_TABLE_SUFFIX}"
+    cursor.execute(f"DROP TABLE IF EXISTS {shadow_table}")
+    cursor.execute(f"CREATE TABLE {shadow_table} LIKE {table}")
+
+    cursor.execute(f"SHOW CREATE TABLE {shadow_table}")
+    create_sql = cursor.fetchone()[1]
+    index_defs = []
+    index_names = []
+    for line in create_sql.splitlines():
+        match = re.match(r'\s*((?:UNIQUE |FULLTEXT |SPATIAL )?KEY `([^`]+)`.*?),?$', line)
+        if match:
+            index_defs.append(match.group(1))
+            index_names.append(match.group(2))
+
+    if index_names:
+        drop_str = ', '.join([f"DROP INDEX `{name}`" for name in index_names])
+        cursor.execute(f"ALTER TABLE {shadow_table} {drop_str}")
+    logger.info(f"Shadow table {shadow_table} created, secondary indexes deferred: {len(index_names)}")
+    return shadow_table, index_defs
+
+
+def swap_shadow_table(cursor, table: str, shadow_table: str, index_defs: list):
+    """
+    一次性重建影子表的二级索引，然后用 RENAME TABLE 原子替换目标表，原表保留为 {table}__old 以便回滚
+    """
+    if index_defs:
+        start_time = time.time()
+        # InnoDB 一条 ALTER 只能新增一个 FULLTEXT 索引，其余索引一次性重建
+        fulltext_defs = [index_def for index_def in index_defs if index_def.startswith('FULLTEXT ')]
+        other_defs = [index_def for index_def in index_defs if not index_def.startswith('FULLTEXT ')]
+        if other_defs:
+            add_str = ', '.join([f"ADD {index_def}" for index_def in other_defs])
+            cursor.execute(f"ALTER TABLE {shadow_table} {add_str}")
+        for index_def in fulltext_defs:
+            cursor.execute(f"ALTER TABLE {shadow_table} ADD {index_def}")
+        logger.info(f"Rebuild {len(index_defs)} indexes on {shadow_table}, cost: {round(time.time() - start_time, 2)}s")
+
+    old_table = f"{table}{OLD_TABLE_SUFFIX}"
+    cursor.execute(f"DROP TABLE IF EXISTS {old_table}")
+    cursor.execute(f"RENAME TABLE {table} TO {old_table}, {shadow_table} TO {table}")
+    logger.info(f"Table {table} replaced, previous data kept in {old_table}")
+
+
 def data_insert_mysql(data_generator, host: str, port: int, user: str, password: str, db: str, table: str,
-                      batch_size=10000):
+                      batch_size=10000, bulk_session=False, skip_binlog=False, replace_table=False, create_sql=None,
+                      **pool_options):
     """
     将数据批量插入mysql
+    :param bulk_session: 是否使用批量导入会话参数，导入结束后恢复
+    :param skip_binlog: 批量导入时关闭 binlog，导入的数据不会同步到从库
+    :param replace_table: 全量替换，先导入影子表再原子替换目标表，读请求不会看到导入一半的数据
+    :param create_sql: 导入前执行的建表语句
+    :param pool_options: 连接池参数，如 connect_timeout
     """
-    conn = connect_to_mysql(host, port, user, password, db)
-    if conn is None:
+    pool = get_pool(host, port, user, password, db, **pool_options)
+    try:
+        conn = pool.acquire(bulk_session, skip_binlog)
+    except Exception as e:
+        logger.error(f"Error connecting to MySQL database: {e}")
         return
 
+    cursor = conn.cursor()
+    if bulk_session:
+        # 按会话的 max_allowed_packet 拼接更大的多行 INSERT
+        cursor.max_stmt_length = conn.max_allowed_packet - 1024
+
+    shadow_table = None
     try:
-        cursor = conn.cursor()
+        if create_sql:
+            cursor.execute(create_sql)
+            logger.info(f"Create table sql executed:\n{create_sql}")
+
+        load_table = table
+        if replace_table:
+            shadow_table, index_defs = create_shadow_table(cursor, table)
+            load_table = shadow_table
+
         count = 0
         data_list = []
         for data in data_generator:
             count += 1
             data_list.append(data)
             if len(data_list) == batch_size:
-                batch_insert_data(cursor, table, data_list)
+                batch_insert_data(cursor, load_table, data_list)
                 data_list = []
 
         if data_list:  # 处理剩余数据
-            batch_insert_data(cursor, table, data_list)
+            batch_insert_data(cursor, load_table, data_list)
+
+        if replace_table:
+            if count == 0:
+                raise RuntimeError(f"No data loaded, {table} is not replaced")
+            swap_shadow_table(cursor, table, shadow_table, index_defs)
+            shadow_table = None
 
         logger.info(f"Data total: {count}, inserted successfully into MySQL table")
     except Exception as e:
         logger.error(f"Error inserting data into MySQL table: {traceback.format_exc()}")
+        if shadow_table:
+            try:
+                cursor.execute(f"DROP TABLE IF EXISTS {shadow_table}")
+                logger.info(f"Shadow table {shadow_table} dropped, {table} is unchanged")
+            except Exception:
+                logger.error(f"Error dropping shadow table {shadow_table}: {traceback.format_exc()}")
     finally:
         cursor.close()
-        conn.close()
+        pool.release(conn)
 
 
 if __name__ == "__main__":
@@ -197,17 +301,30 @@ if __name__ == "__main__":
     start_time = time.time()
 
     file_extension = os.path.splitext(args.file)[1]
+    pool_options = dict(connect_timeout=args.connect_timeout)
 
     if file_extension in ('.xls', '.xlsx'):
-        data_insert_mysql(xls_generator_data(args.file), args.host, args.port, args.user, args.password, args.db,
-                          args.table)
+        read_data = partial(xls_generator_data, args.file)
     elif file_extension in ('.csv', ):
-        data_insert_mysql(csv_generator_data(args.file, args.encoding), args.host, args.port, args.user, args.password,
-                          args.db,
-                          args.table)
+        read_data = partial(csv_generator_data, args.file, args.encoding)
     else:
         logger.error('The file format is not supported, only excel/csv formats are supported')
         sys.exit(1)
 
+    data_generator = read_data()
+    create_sql = None
+    if args.create_table or args.ddl_only:
+        columns = infer_table_schema(read_data(), args.sample_rows)
+        create_sql = build_create_table_sql(args.table, columns)
+        if args.ddl_only:
+            print(create_sql + ';')
+            sys.exit(0)
+        data_generator = normalize_rows(data_generator, columns)
+
+    data_insert_mysql(data_generator, args.host, args.port, args.user, args.password, args.db, args.table,
+                      bulk_session=args.bulk_session, skip_binlog=args.skip_binlog, replace_table=args.replace_table, create_sql=create_sql,
+                      **pool_options)
+    close_all_pools()
+
     end_time = time.time()
     logger.info(f"Import finish, cost time: {round(end_time - start_time, 2)}s")
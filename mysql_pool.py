@@ -0,0 +1,247 @@
+#!/usr/bin/python3
+"""
+@Desc   ：Shared mysql connection pool for the import/export tools
+"""
+import time
+import threading
+import logging
+from contextlib import contextmanager
+
+import pymysql
+
+
+def get_logger(name):
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    formatter = logging.Formatter('%(asctime)s %(name)s %(levelname)s: %(message)s')
+    handler = logging.StreamHandler()
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    return logger
+
+
+logger = get_logger('mysql_pool')
+
+# 批量导入会话参数，release时恢复为原值
+# binlog 保持开启，否则导入的数据不会同步到从库；确需关闭时使用 skip_binlog
+BULK_SESSION_SETTINGS = {
+    'unique_checks': 0,
+    'foreign_key_checks': 0,
+    'net_read_timeout': 600,
+    'net_write_timeout': 600,
+    'bulk_insert_buffer_size': 256 * 1024 * 1024,
+}
+
+# 批量会话下客户端单个数据包上限，实际取值不超过服务端 max_allowed_packet
+BULK_MAX_ALLOWED_PACKET = 64 * 1024 * 1024
+
+
+class MySQLConnectionPool(object):
+    """
+    有上限的mysql连接池，支持空闲保活、断线重连重试以及批量导入会话参数。
+
+    Example:
+        示例用法：
+
+        >>> pool = MySQLConnectionPool('127.0.0.1', 3306, 'root', '123456', 'test')
+        >>> with pool.connection(bulk_session=True) as conn:
+        ...     with conn.cursor() as cursor:
+        ...         cursor.execute('select 1')
+        >>> pool.close()
+    """
+
+    def __init__(self, host: str, port: int, user: str, password: str, db: str, max_size=4, connect_timeout=10,
+                 read_timeout=None, write_timeout=None, retries=3, retry_interval=1.0,
+                 keepalive_interval=60):
+        self.host = host
+        self.port = int(port)
+        self.user = user
+        self.password = password
+        self.db = db
+        self.max_size = max_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.write_timeout = write_timeout
+        self.retries = retries
+        self.retry_interval = retry_interval
+        self.keepalive_interval = keepalive_interval
+
+        self._idle = []  # [(conn, last_used_time)]
+        self._session_backup = {}  # id(conn) -> {变量名: 原值}
+        self._packet_backup = {}  # id(conn) -> 客户端 max_allowed_packet 原值
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def _connect(self):
+        """
+        建立新连接，失败时按 retries/retry_interval 重试
+        """
+        kwargs = dict(
+            host=self.host,
+            port=self.port,
+            user=self.user,
+            password=self.password,
+            database=self.db,
+            autocommit=True,
+            connect_timeout=self.connect_timeout,
+            read_timeout=self.read_timeout,
+            write_timeout=self.write_timeout,
+        )
+
+        for attempt in range(1, self.retries + 1):
+            try:
+                conn = pymysql.connect(**kwargs)
+                logger.info("Successfully connected to MySQL database")
+                return conn
+            except pymysql.err.OperationalError as e:
+                if attempt >= self.retries:
+                    raise
+                logger.warning(f"Connect to MySQL failed ({e}), retry {attempt}/{self.retries - 1}")
+                time.sleep(self.retry_interval * attempt)
+
+    def _keepalive(self, conn, last_used):
+        """
+        空闲超过 keepalive_interval 的连接先 ping 一次，断开则自动重连
+        """
+        if time.time() - last_used < self.keepalive_interval:
+            return conn
+        try:
+            conn.ping(reconnect=True)
+            return conn
+        except pymysql.err.Error as e:
+            logger.warning(f"Idle MySQL connection is dead ({e}), reconnecting")
+            self._discard(conn)
+            return self._connect()
+
+    def _discard(self, conn):
+        self._session_backup.pop(id(conn), None)
+        self._packet_backup.pop(id(conn), None)
+        try:
+            conn.close()
+        except pymysql.err.Error:
+            pass
+
+    def _apply_bulk_session(self, conn, skip_binlog=False):
+        """
+        设置批量导入会话参数，并记录原值以便 release 时恢复
+        :param skip_binlog: 同时关闭本会话的 binlog，导入的数据不会同步到从库
+        """
+        settings = dict(BULK_SESSION_SETTINGS)
+        if skip_binlog:
+            settings['sql_log_bin'] = 0
+            logger.warning("Binlog is disabled for this session, imported data will NOT be replicated")
+
+        backup = {}
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT @@GLOBAL.max_allowed_packet")
+            server_packet = int(cursor.fetchone()[0])
+            self._packet_backup[id(conn)] = conn.max_allowed_packet
+            conn.max_allowed_packet = min(server_packet, BULK_MAX_ALLOWED_PACKET)
+
+            for name, value in settings.items():
+                try:
+                    cursor.execute(f"SELECT @@SESSION.{name}")
+                    original = cursor.fetchone()[0]
+                    cursor.execute(f"SET SESSION {name} = %s", (value,))
+                    backup[name] = original
+                except pymysql.err.Error as e:
+                    # sql_log_bin 等参数需要额外权限，设置失败时跳过
+                    logger.warning(f"Skip bulk session setting {name}={value}: {e}")
+        self._session_backup[id(conn)] = backup
+        logger.info(f"Bulk session enabled: {', '.join(backup) or 'none'}")
+
+    def _restore_session(self, conn):
+        packet = self._packet_backup.pop(id(conn), None)
+        if packet is not None:
+            conn.max_allowed_packet = packet
+
+        backup = self._session_backup.pop(id(conn), None)
+        if not backup:
+            return
+        with conn.cursor() as cursor:
+            for name, value in backup.items():
+                cursor.execute(f"SET SESSION {name} = %s", (value,))
+        logger.info("Bulk session settings restored")
+
+    def acquire(self, bulk_session=False, skip_binlog=False):
+        """
+        从连接池获取连接，池满时阻塞等待
+        :param bulk_session: 是否启用批量导入会话参数
+        :param skip_binlog: 是否关闭本会话的 binlog，仅在 bulk_session 时生效
+        :return: pymysql连接
+        """
+        self._slots.acquire()
+        conn = None
+        try:
+            with self._lock:
+                idle = self._idle.pop() if self._idle else None
+            conn = self._keepalive(*idle) if idle is not None else self._connect()
+
+            if bulk_session:
+                self._apply_bulk_session(conn, skip_binlog)
+            return conn
+        except BaseException:
+            # 会话参数可能只设置了一部分，直接关闭连接而不是放回连接池
+            if conn is not None:
+                self._discard(conn)
+            self._slots.release()
+            raise
+
+    def release(self, conn):
+        """
+        归还连接，恢复会话参数后放回空闲队列；恢复失败的连接直接关闭
+        """
+        try:
+            if conn.open:
+                self._restore_session(conn)
+                with self._lock:
+                    self._idle.append((conn, time.time()))
+            else:
+                self._discard(conn)
+        except pymysql.err.Error as e:
+            logger.warning(f"Failed to reset MySQL connection, discard it: {e}")
+            self._discard(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self, bulk_session=False, skip_binlog=False):
+        conn = self.acquire(bulk_session, skip_binlog)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """
+        关闭所有空闲连接
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._discard(conn)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(host: str, port: int, user: str, password: str, db: str, **kwargs):
+    """
+    按连接参数和连接池参数返回共享的连接池，同一进程内参数相同的调用复用同一个池
+    """
+    key = (host, int(port), user, password, db, tuple(sorted(kwargs.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = MySQLConnectionPool(host, port, user, password, db, **kwargs)
+            _pools[key] = pool
+        return pool
+
+
+def close_all_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
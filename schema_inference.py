@@ -0,0 +1,266 @@
+#!/usr/bin/python3
+"""
+@Desc   ：Infer mysql column types from excel/csv rows and build CREATE TABLE sql
+"""
+import re
+import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+# 整型范围，按从小到大选择能容纳的最窄类型
+INT_TYPES = [
+    ('TINYINT', 2 ** 7),
+    ('SMALLINT', 2 ** 15),
+    ('MEDIUMINT', 2 ** 23),
+    ('INT', 2 ** 31),
+    ('BIGINT', 2 ** 63),
+]
+
+# 样本中的长度/数值只代表已见数据，建表时预留余量
+LENGTH_HEADROOM = 1.5
+INT_HEADROOM = 2
+DECIMAL_INT_HEADROOM = 2
+
+# 纯数字或身份证号形态的列，所有值等长且不超过该长度时使用 CHAR
+CHAR_MAX_LENGTH = 32
+# 超过该长度使用 TEXT；整行宽度由 build_create_table_sql 另行控制
+VARCHAR_MAX_LENGTH = 1024
+# mysql 单行宽度上限 65535 字节，TEXT 只计入约 12 字节的指针
+ROW_SIZE_LIMIT = 65535
+UTF8MB4_BYTES = 4
+TEXT_POINTER_BYTES = 12
+FIXED_COLUMN_BYTES = 8
+
+INT_PATTERN = re.compile(r'^[-+]?\d+$')
+DECIMAL_PATTERN = re.compile(r'^[-+]?\d*\.\d+$')
+DIGITS_PATTERN = re.compile(r'^\d+$')
+# 多数值符合以下形态（允许少量脏数据）时按字符串处理，而不是整数
+PHONE_SHAPE = re.compile(r'^1[3-9]\d{9}$')
+ID_CARD_SHAPE = re.compile(r'^[1-9]\d{5}(?:19|20)\d{2}(?:0[1-9]|1[0-2])(?:0[1-9]|[12]\d|3[01])\d{3}[\dXx]$')
+ID_CARD_15_SHAPE = re.compile(r'^[1-9]\d{5}\d{2}(?:0[1-9]|1[0-2])(?:0[1-9]|[12]\d|3[01])\d{3}$')
+SHAPE_MATCH_RATIO = 0.5
+# 等宽的纯数字列，宽度为手机号/身份证号长度时按字符串处理
+IDENTIFIER_WIDTHS = (11, 15, 18)
+DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d')
+DATETIME_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y/%m/%d %H:%M:%S')
+
+
+def _match_datetime(value: str, formats):
+    for fmt in formats:
+        try:
+            datetime.datetime.strptime(value, fmt)
+            return True
+        except ValueError:
+            continue
+    return False
+
+
+class ColumnStats(object):
+    """
+    单列的统计信息，只保存聚合值，内存占用与行数无关
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.null_count = 0
+        self.min_length = None
+        self.max_length = 0
+        self.is_int = True
+        self.is_decimal = True
+        self.is_date = True
+        self.is_datetime = True
+        self.is_digits = True
+        self.phone_count = 0
+        self.id_card_count = 0
+        self.has_leading_zero = False
+        self.force_text = False
+        self.min_int = None
+        self.max_int = None
+        self.max_int_digits = 0
+        self.max_scale = 0
+
+    def update(self, value):
+        value = '' if value is None else str(value).strip()
+        if value == '':
+            self.null_count += 1
+            return
+
+        self.count += 1
+        length = len(value)
+        self.max_length = max(self.max_length, length)
+        self.min_length = length if self.min_length is None else min(self.min_length, length)
+
+        if self.is_digits and not DIGITS_PATTERN.match(value):
+            self.is_digits = False
+        if PHONE_SHAPE.match(value):
+            self.phone_count += 1
+        elif ID_CARD_SHAPE.match(value) or ID_CARD_15_SHAPE.match(value):
+            self.id_card_count += 1
+
+        if self.is_int:
+            self._update_int(value)
+        if self.is_decimal:
+            self._update_decimal(value)
+        if self.is_date:
+            self.is_date = _match_datetime(value, DATE_FORMATS)
+        if self.is_datetime:
+            self.is_datetime = _match_datetime(value, DATETIME_FORMATS)
+
+    def _update_int(self, value):
+        if not INT_PATTERN.match(value):
+            self.is_int = False
+            return
+        digits = value.lstrip('+-')
+        if len(digits) > 1 and digits.startswith('0'):
+            self.has_leading_zero = True
+        number = int(value)
+        self.min_int = number if self.min_int is None else min(self.min_int, number)
+        self.max_int = number if self.max_int is None else max(self.max_int, number)
+
+    def _update_decimal(self, value):
+        if not (INT_PATTERN.match(value) or DECIMAL_PATTERN.match(value)):
+            self.is_decimal = False
+            return
+        try:
+            number = Decimal(value)
+        except InvalidOperation:
+            self.is_decimal = False
+            return
+        sign, digits, exponent = number.as_tuple()
+        scale = max(-exponent, 0)
+        self.max_scale = max(self.max_scale, scale)
+        self.max_int_digits = max(self.max_int_digits, len(digits) - scale)
+
+    def is_identifier(self):
+        """
+        有前导0、多数值是手机号/身份证号形态、或等宽且宽度为 11/15/18 位的数字列按字符串保存，不当作数值
+        """
+        if self.has_leading_zero:
+            return True
+        if max(self.phone_count, self.id_card_count) > self.count * SHAPE_MATCH_RATIO:
+            return True
+        return self.is_digits and self.min_length == self.max_length and self.max_length in IDENTIFIER_WIDTHS
+
+    def is_id_card(self):
+        return self.id_card_count > self.count * SHAPE_MATCH_RATIO
+
+    def column_type(self):
+        """
+        返回能容纳样本数据的最窄mysql类型
+        """
+        if self.force_text:
+            return 'TEXT'
+        if self.count == 0:
+            return 'VARCHAR(255)'
+
+        identifier = self.is_identifier()
+        if self.is_int and not identifier:
+            unsigned = self.min_int >= 0
+            bound = max(abs(self.min_int), abs(self.max_int)) * INT_HEADROOM
+            for type_name, limit in INT_TYPES:
+                if unsigned and bound < limit * 2:
+                    return f'{type_name} UNSIGNED'
+                if not unsigned and bound < limit:
+                    return type_name
+
+        # 超出 BIGINT 范围的整数同样使用 DECIMAL
+        if self.is_decimal and not identifier:
+            int_digits = max(self.max_int_digits, 1) + DECIMAL_INT_HEADROOM
+            precision = min(int_digits + self.max_scale, 65)
+            return f'DECIMAL({precision},{min(self.max_scale, 30)})'
+
+        if self.is_datetime:
+            return 'DATETIME'
+        if self.is_date:
+            return 'DATE'
+
+        if (self.is_digits or self.is_id_card()) and self.min_length == self.max_length \
+                and self.max_length <= CHAR_MAX_LENGTH:
+            return f'CHAR({self.max_length})'
+
+        length = int(self.max_length * LENGTH_HEADROOM)
+        if length > VARCHAR_MAX_LENGTH:
+            return 'TEXT'
+        # 取不小于 length 的 2 的幂，便于同一字段在不同批次间保持一致
+        size = 16
+        while size < length:
+            size *= 2
+        return f'VARCHAR({size})'
+
+    def is_string(self):
+        return self.column_type().startswith(('CHAR', 'VARCHAR', 'TEXT'))
+
+    def row_bytes(self):
+        """
+        该列在 utf8mb4 下占用的行宽（字节），用于检查整行是否超过 ROW_SIZE_LIMIT
+        """
+        column_type = self.column_type()
+        match = re.match(r'^(VAR)?CHAR\((\d+)\)$', column_type)
+        if match:
+            return int(match.group(2)) * UTF8MB4_BYTES + (2 if match.group(1) else 0)
+        if column_type == 'TEXT':
+            return TEXT_POINTER_BYTES
+        return FIXED_COLUMN_BYTES
+
+
+def infer_table_schema(data_generator, sample_rows=10000):
+    """
+    从数据生成器中抽样推断每列的类型
+    Args:
+        data_generator: 逐行返回 dict 的生成器，如 csv_generator_data。
+        sample_rows (int, optional): 抽样行数，0 表示扫描全部数据，默认为 10000。
+
+    Returns:
+        list: 按列顺序排列的 ColumnStats。
+
+    Example:
+        示例用法：
+
+        >>> columns = infer_table_schema(csv_generator_data('data.csv'))
+        >>> [(c.name, c.column_type()) for c in columns]
+        [('id', 'SMALLINT UNSIGNED'), ('id_card', 'CHAR(18)'), ...]
+    """
+    rows = islice(data_generator, sample_rows) if sample_rows else data_generator
+    columns = {}
+    for row in rows:
+        for name, value in row.items():
+            stats = columns.get(name)
+            if stats is None:
+                stats = columns[name] = ColumnStats(name)
+            stats.update(value)
+    return list(columns.values())
+
+
+def build_create_table_sql(table: str, columns: list):
+    """
+    根据推断的列类型生成建表语句，整行宽度超过 ROW_SIZE_LIMIT 时把最宽的 VARCHAR 列改为 TEXT
+    """
+    varchar_columns = sorted([c for c in columns if c.column_type().startswith('VARCHAR')],
+                             key=lambda c: c.row_bytes(), reverse=True)
+    # 所有列都允许 NULL，每 8 列额外占用 1 字节的 NULL 标记
+    row_limit = ROW_SIZE_LIMIT - (len(columns) + 7) // 8
+    row_size = sum([c.row_bytes() for c in columns])
+    for c in varchar_columns:
+        if row_size <= row_limit:
+            break
+        row_size -= c.row_bytes()
+        c.force_text = True
+        row_size += c.row_bytes()
+
+    column_defs = [f"  `{c.name}` {c.column_type()} DEFAULT NULL" for c in columns]
+    column_str = ',\n'.join(column_defs)
+    return f"CREATE TABLE IF NOT EXISTS {table} (\n{column_str}\n) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
+
+
+def normalize_rows(data_generator, columns: list):
+    """
+    非字符串类型的列把空字符串转换为 NULL，避免严格模式下插入失败
+    """
+    nullable = [c.name for c in columns if not c.is_string()]
+    for row in data_generator:
+        for name in nullable:
+            value = row.get(name)
+            if value is not None and str(value).strip() == '':
+                row[name] = None
+        yield row
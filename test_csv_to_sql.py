@@ -0,0 +1,77 @@
+import os
+import csv
+import tempfile
+import unittest
+
+try:
+    from csv_to_sql import check_id_numbers, check_phones, validate_batch, validate_rows, valid_set_dict
+except ImportError as e:
+    raise unittest.SkipTest(f'csv_to_sql dependencies are not installed: {e}')
+
+
+class CheckIdNumbersTest(unittest.TestCase):
+
+    def test_valid_and_bad_checksum(self):
+        self.assertEqual(check_id_numbers(['11010519491231002X', '110105194912310021']), [None, 'ID_CHECKSUM'])
+
+    def test_lowercase_x_is_rejected(self):
+        self.assertEqual(check_id_numbers(['11010519491231002x']), ['ID_FORMAT'])
+
+    def test_legacy_15_digit(self):
+        self.assertEqual(check_id_numbers(['110105491231002', '110105491331002']), [None, 'ID_BIRTH_DATE'])
+
+    def test_region_length_and_birth_date(self):
+        self.assertEqual(check_id_numbers(['99010519491231002X', '1101051949123100', '11010519491331002X']),
+                         ['ID_REGION', 'ID_LENGTH', 'ID_BIRTH_DATE'])
+
+    def test_empty(self):
+        self.assertEqual(check_id_numbers(['', None]), [None, None])
+
+
+class CheckPhonesTest(unittest.TestCase):
+
+    def test_phones(self):
+        self.assertEqual(check_phones(['13800138000', '1380013800', '138001380001', '12800138000', '138-0013800', '']),
+                         [None, 'PHONE_LENGTH', 'PHONE_LENGTH', 'PHONE_PREFIX', 'PHONE_FORMAT', None])
+
+
+class ValidateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rows = [
+            {'id': '1', '学生姓名': '张 三', '学生证件号': '110105194912310021', '被报人证件号': '11010519491231002X',
+             '投保人手机号': '13800138000', '被保人手机号': '1380013800'},
+            {'id': '2', '学生姓名': '李四', '学生证件号': '11010519491231002X', '被报人证件号': '',
+             '投保人手机号': '', '被保人手机号': ''},
+        ]
+
+    def test_only_failing_fields_are_dropped(self):
+        invalid = validate_batch(self.rows, 'rule_2')
+        self.assertEqual(invalid, [{'学生证件号': 'ID_CHECKSUM', '被保人手机号': 'PHONE_LENGTH'}, {}])
+
+        set_dict = valid_set_dict(self.rows[0], 'rule_2', {'student_cert_no': '学生证件号',
+                                                           'pro_the_insure_cert_no': '被报人证件号'}, invalid[0])
+        self.assertEqual(set_dict, {'pro_the_insure_cert_no': '11010519491231002X'})
+        self.assertIsNone(valid_set_dict(self.rows[0], 'rule_2', {'student_cert_no': '学生证件号'}, invalid[0]))
+        self.assertEqual(valid_set_dict(self.rows[0], 'rule_2', {'student_name': '学生姓名'}, invalid[0]),
+                         {'student_name': '张三'})
+
+    def test_reject_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            reject_file = os.path.join(tmp, 'reject.csv')
+            results = list(validate_rows(iter(self.rows), 'rule_2', reject_file))
+            self.assertEqual([row['id'] for row, _ in results], ['1', '2'])
+            with open(reject_file, encoding='utf-8') as f:
+                rejected = list(csv.DictReader(f))
+            self.assertEqual(len(rejected), 1)
+            self.assertEqual(rejected[0]['reject_reason'], '学生证件号:ID_CHECKSUM|被保人手机号:PHONE_LENGTH')
+
+    def test_no_reject_file_for_clean_input(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            reject_file = os.path.join(tmp, 'reject.csv')
+            list(validate_rows(iter(self.rows[1:]), 'rule_2', reject_file))
+            self.assertFalse(os.path.exists(reject_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
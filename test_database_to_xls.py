@@ -0,0 +1,66 @@
+import unittest
+
+try:
+    from database_to_xls import incremental_rows, incremental_query
+except ImportError as e:
+    raise unittest.SkipTest(f'database_to_xls dependencies are not installed: {e}')
+
+
+def export(rows, state):
+    return [row['name'] for row in incremental_rows(iter(rows), 'update_time', state)]
+
+
+class IncrementalRowsTest(unittest.TestCase):
+
+    def test_first_run_records_boundary(self):
+        state = {}
+        rows = [{'update_time': 1, 'name': 'a'}, {'update_time': 2, 'name': 'b'}, {'update_time': 2, 'name': 'c'}]
+        self.assertEqual(export(rows, state), ['a', 'b', 'c'])
+        self.assertEqual(state['last_value'], 2)
+        self.assertEqual(len(state['boundary_digests']), 2)
+
+    def test_resume_on_same_value_skips_exported_ties(self):
+        state = {}
+        export([{'update_time': 2, 'name': 'b'}, {'update_time': 2, 'name': 'c'}], state)
+
+        # 同一水位值上新增了一行 d，之前导出的 b、c 不再重复
+        rows = [{'update_time': 2, 'name': 'b'}, {'update_time': 2, 'name': 'c'}, {'update_time': 2, 'name': 'd'}]
+        self.assertEqual(export(rows, state), ['d'])
+        self.assertEqual(state['last_value'], 2)
+        self.assertEqual(len(state['boundary_digests']), 3)
+
+        # 水位前进后边界重置
+        rows = rows + [{'update_time': 3, 'name': 'e'}]
+        self.assertEqual(export(rows, state), ['e'])
+        self.assertEqual(state['last_value'], 3)
+        self.assertEqual(len(state['boundary_digests']), 1)
+
+    def test_many_ties(self):
+        state = {}
+        rows = [{'update_time': 1, 'name': str(i)} for i in range(20000)]
+        self.assertEqual(len(export(rows, state)), 20000)
+        self.assertEqual(len(state['boundary_digests']), 20000)
+        self.assertEqual(export(rows, state), [])
+
+    def test_partial_export_keeps_prefix_state(self):
+        state = {}
+        rows = [{'update_time': 1, 'name': 'a'}, {'update_time': 2, 'name': 'b'}, {'update_time': 3, 'name': 'c'}]
+        generator = incremental_rows(iter(rows), 'update_time', state)
+        next(generator)
+        next(generator)
+        generator.close()
+        self.assertEqual(state['last_value'], 2)
+
+    def test_null_watermark_does_not_advance_state(self):
+        state = {}
+        self.assertEqual(export([{'update_time': None, 'name': 'a'}], state), ['a'])
+        self.assertNotIn('last_value', state)
+
+    def test_incremental_query(self):
+        sql = incremental_query("select * from t where name like 'a%';", 'update_time')
+        self.assertEqual(sql, "SELECT * FROM (select * from t where name like 'a%%') AS incremental_t "
+                              "WHERE update_time >= %s ORDER BY update_time")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+
+from schema_inference import ColumnStats, infer_table_schema, build_create_table_sql, normalize_rows
+
+
+def infer(values):
+    stats = ColumnStats('c')
+    for value in values:
+        stats.update(value)
+    return stats.column_type()
+
+
+class ColumnTypeTest(unittest.TestCase):
+
+    def test_int_sizes(self):
+        self.assertEqual(infer(['1', '100']), 'TINYINT UNSIGNED')
+        self.assertEqual(infer(['1', '300']), 'SMALLINT UNSIGNED')
+        self.assertEqual(infer(['-5', '100']), 'SMALLINT')
+        self.assertEqual(infer(['1700000000']), 'INT UNSIGNED')
+
+    def test_long_int_is_bigint(self):
+        self.assertEqual(infer(['1700000000000', '1700000000123']), 'BIGINT UNSIGNED')
+        self.assertEqual(infer(['123456789012345', '98765432101']), 'BIGINT UNSIGNED')
+        self.assertEqual(infer(['123456789012345678901234']), 'DECIMAL(26,0)')
+
+    def test_decimal(self):
+        self.assertEqual(infer(['0.5', '0.25', '1.75']), 'DECIMAL(5,2)')
+        self.assertEqual(infer(['3', '0.5']), 'DECIMAL(4,1)')
+        self.assertEqual(infer(['-0.5', '2']), 'DECIMAL(4,1)')
+        self.assertEqual(infer(['12345678.90', '1.00']), 'DECIMAL(12,2)')
+
+    def test_leading_zero_is_string(self):
+        self.assertEqual(infer(['007', '012']), 'CHAR(3)')
+        self.assertEqual(infer(['007', '12']), 'VARCHAR(16)')
+
+    def test_phone_and_id_card_are_char(self):
+        self.assertEqual(infer(['13800138000', '15912345678']), 'CHAR(11)')
+        self.assertEqual(infer(['11010519491231002X', '110105194912310021']), 'CHAR(18)')
+
+    def test_phone_column_with_malformed_value(self):
+        self.assertEqual(infer(['13800138000', '15912345678', '1381234567']), 'VARCHAR(16)')
+
+    def test_legacy_15_digit_id_card(self):
+        self.assertEqual(infer(['110105491231002', '310104800101123']), 'CHAR(15)')
+
+    def test_id_card_column_with_bad_birth_date(self):
+        self.assertEqual(infer(['110105194912310021', '110105194913310021', '310104198001011234']), 'CHAR(18)')
+        self.assertEqual(infer(['11010519491231002X', '110105194913310021', '3101041980010112']), 'VARCHAR(32)')
+
+    def test_short_text_is_varchar(self):
+        self.assertEqual(infer(['ok', 'no']), 'VARCHAR(16)')
+        self.assertEqual(infer(['张三', '欧阳娜娜娜']), 'VARCHAR(16)')
+
+    def test_date_and_datetime(self):
+        self.assertEqual(infer(['2024-07-20', '2024/07/21']), 'DATE')
+        self.assertEqual(infer(['2024-07-20 01:00:00']), 'DATETIME')
+
+    def test_empty_column(self):
+        self.assertEqual(infer(['', None]), 'VARCHAR(255)')
+
+
+class SchemaTest(unittest.TestCase):
+
+    def test_create_table_sql(self):
+        rows = [{'id': '1', 'phone': '13800138000'}, {'id': '2', 'phone': '13900138000'}]
+        sql = build_create_table_sql('t1', infer_table_schema(iter(rows)))
+        self.assertIn('`id` TINYINT UNSIGNED DEFAULT NULL', sql)
+        self.assertIn('`phone` CHAR(11) DEFAULT NULL', sql)
+
+    def test_row_size_falls_back_to_text(self):
+        rows = [{f'c{i}': 'a' * 600 for i in range(16)}]
+        columns = infer_table_schema(iter(rows))
+        sql = build_create_table_sql('t1', columns)
+        self.assertIn('TEXT', sql)
+        self.assertLessEqual(sum([c.row_bytes() for c in columns]), 65535 - 2)
+        self.assertIn('VARCHAR(1024)', sql)
+
+    def test_sample_rows(self):
+        rows = [{'id': '1'}, {'id': '2'}, {'id': 'abc'}]
+        columns = infer_table_schema(iter(rows), sample_rows=2)
+        self.assertEqual(columns[0].column_type(), 'TINYINT UNSIGNED')
+
+    def test_normalize_rows(self):
+        columns = infer_table_schema(iter([{'id': '1', 'name': 'a'}]))
+        rows = list(normalize_rows(iter([{'id': '', 'name': ''}]), columns))
+        self.assertEqual(rows, [{'id': None, 'name': ''}])
+
+
+if __name__ == '__main__':
+    unittest.main()